@@ -0,0 +1,53 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+# Apps whose models are read from the replica, others (e.g. admin, auth and sessions) are
+# always read from the primary so users read their own writes right after making them
+REPLICA_APPS = {"posts"}
+
+
+class ReplicaRouter:
+    """Routes reads of posts app models made while handling a safe web request (PostList,
+    export and info views) to the read replica if one is configured. Everything else,
+    including all reads and writes of celery tasks, goes to the primary, so crawls never read
+    their own writes from a lagging replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _replica_reads.get()
+            and model._meta.app_label in REPLICA_APPS
+            and REPLICA in settings.DATABASES
+        ):
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica mirrors primary, so objects from both are the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaReadsMiddleware:
+    """Enables replica reads for the duration of GET, HEAD and OPTIONS requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _replica_reads.set(request.method in ("GET", "HEAD", "OPTIONS"))
+        try:
+            return self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
@@ -0,0 +1,286 @@
+import json
+import logging
+
+from typing import Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import DatabaseError, DataError, IntegrityError, connection, transaction
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from hackernews_clone.posts.models import FeedRank, Post, PostAggregate
+
+logger = logging.getLogger(__name__)
+
+SCRAPPER = "scrapper"
+API = "api"
+SENTIMENT = "sentiment"
+
+# Sources in ascending precedence. When several sources carry the same field for a post
+# within one buffer window, the value of the source coming later in this list wins.
+SOURCE_PRECEDENCE = [SENTIMENT, SCRAPPER, API]
+
+# Keeps number of query parameters of a single upsert statement well below db limits
+UPSERT_BATCH_SIZE = 1000
+# Seconds after which flush lock is released even if its holder died
+FLUSH_LOCK_TIMEOUT = 60
+
+POST_FIELDS = [
+    "url",
+    "subject",
+    "submitted_by",
+    "rank",
+    "score",
+    "submitted_at",
+    "domain",
+    "num_of_comments",
+]
+
+
+class PostUpdateBuffer:
+    """Collects post updates coming from scrapper, api fetcher and sentiment workers in redis
+    and writes them to db as a single batched upsert per flush.
+
+    Each update is stored under the post id and its source. An update consists of `fields`,
+    which are written whether the post exists or not, `insert_only` fields, which are used
+    only when the post doesn't exist yet (e.g. the post snapshot a sentiment task carries),
+    and `feeds`, ranks of the post keyed by feed name. A newer update from the same source
+    replaces the older one, updates of different sources are merged by SOURCE_PRECEDENCE on
+    flush. A source may be suffixed with a feed name (e.g. "scrapper:ask") so updates of
+    the same post coming from different feeds don't replace each other.
+    """
+
+    DIRTY_KEY = "posts:buffer:dirty"
+    FLUSH_SCHEDULED_KEY = "posts:buffer:flush-scheduled"
+    FLUSH_LOCK_KEY = "posts:buffer:flush-lock"
+    ENTRY_KEY = "posts:buffer:entry:{}"
+
+    def __init__(self, redis=None):
+        self.redis = redis or get_redis_connection("default")
+
+    def add(
+        self,
+        post_id: int,
+        source: str,
+        fields: Dict,
+        insert_only: Optional[Dict] = None,
+        feeds: Optional[Dict[str, int]] = None,
+    ) -> bool:
+        """Buffers an update for the post with given id. Returns True if there isn't a flush
+        scheduled for the current window, in which case caller is responsible to schedule it.
+        """
+        update = {"fields": fields, "insert_only": insert_only or {}, "feeds": feeds or {}}
+        pipe = self.redis.pipeline()
+        pipe.hset(self.ENTRY_KEY.format(post_id), source, json.dumps(update))
+        pipe.sadd(self.DIRTY_KEY, post_id)
+        # Expire scheduled flag eventually, so a lost flush task can't block future flushes
+        pipe.set(
+            self.FLUSH_SCHEDULED_KEY,
+            1,
+            nx=True,
+            ex=max(int(settings.POST_UPDATE_BUFFER_WINDOW * 10), 10),
+        )
+        return bool(pipe.execute()[-1])
+
+    def drain(self) -> Dict[int, Dict[str, Dict]]:
+        """Atomically takes all buffered updates out of redis and returns them by source per
+        post id.
+        """
+        flushing_key = f"{self.DIRTY_KEY}:{uuid4().hex}"
+        try:
+            # Renaming makes sure updates arriving while draining go into a fresh dirty set
+            self.redis.rename(self.DIRTY_KEY, flushing_key)
+        except ResponseError:
+            # Nothing is buffered
+            return {}
+
+        post_ids = [int(post_id) for post_id in self.redis.smembers(flushing_key)]
+        pipe = self.redis.pipeline(transaction=True)
+        for post_id in post_ids:
+            pipe.hgetall(self.ENTRY_KEY.format(post_id))
+            pipe.delete(self.ENTRY_KEY.format(post_id))
+        pipe.delete(flushing_key)
+        results = pipe.execute()
+
+        drained = {}
+        for post_id, entries in zip(post_ids, results[::2]):
+            # Post may already be drained by a concurrent flush
+            if entries:
+                drained[post_id] = {
+                    source.decode(): json.loads(update) for source, update in entries.items()
+                }
+        return drained
+
+    def restore(self, drained: Dict[int, Dict[str, Dict]]) -> None:
+        """Puts drained updates back to be written on next flush. An update buffered from the
+        same source since draining is newer, so it's kept instead of the restored one.
+        """
+        pipe = self.redis.pipeline()
+        for post_id, updates_by_source in drained.items():
+            for source, update in updates_by_source.items():
+                pipe.hsetnx(self.ENTRY_KEY.format(post_id), source, json.dumps(update))
+            pipe.sadd(self.DIRTY_KEY, post_id)
+        pipe.execute()
+
+    def flush(self) -> int:
+        """Drains the buffer and writes all updates to db. Returns number of posts written.
+
+        Flushes run one at a time, so once a flush returns, updates drained by flushes
+        started before it are written too.
+        """
+        with self.redis.lock(self.FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT):
+            self.redis.delete(self.FLUSH_SCHEDULED_KEY)
+            drained = self.drain()
+            if not drained:
+                return 0
+            return self.write(drained)
+
+    def write(self, drained: Dict[int, Dict[str, Dict]]) -> int:
+        """Writes drained updates to db. Returns number of posts written.
+
+        An invalid update (e.g. a post missing its subject) fails the whole batch, in which
+        case posts are written one by one and only invalid ones are dropped. On other db
+        errors, e.g. a deadlock or a lost connection, updates not written yet are restored
+        and the error is raised to retry the flush.
+        """
+        pending = dict(drained)
+        written = 0
+        try:
+            try:
+                upsert_posts(
+                    {post_id: merge_updates(updates) for post_id, updates in drained.items()}
+                )
+                written, pending = len(drained), {}
+            except (DataError, IntegrityError):
+                logger.exception("Writing buffered post updates failed, writing one by one")
+                for post_id in sorted(drained):
+                    try:
+                        upsert_posts({post_id: merge_updates(drained[post_id])})
+                        written += 1
+                    except (DataError, IntegrityError):
+                        logger.exception(f"Dropping invalid buffered update of post {post_id}")
+                    del pending[post_id]
+        except DatabaseError:
+            self.restore(pending)
+            raise
+
+        logger.info(f"Flushed {written} buffered post updates")
+        return written
+
+
+def merge_updates(updates_by_source: Dict[str, Dict]) -> Dict:
+    """Merges updates of a single post by SOURCE_PRECEDENCE."""
+    fields, insert_only, feeds = {}, {}, {}
+    for source in sorted(updates_by_source, key=source_precedence):
+        fields.update(updates_by_source[source]["fields"])
+        insert_only.update(updates_by_source[source]["insert_only"])
+        feeds.update(updates_by_source[source]["feeds"])
+    return {"fields": fields, "insert_only": insert_only, "feeds": feeds}
+
+
+def source_precedence(source: str) -> int:
+    return SOURCE_PRECEDENCE.index(source.split(":")[0])
+
+
+def post_update_fields(post: Dict) -> Dict:
+    """Returns fields of given post to be written by persist. Rank of the post is written only
+    if it's known, i.e. post is listed in PRIMARY_FEED, not to override it by other feeds.
+    """
+    return {
+        field: post[field]
+        for field in POST_FIELDS
+        if field != "rank" or post["rank"] is not None
+    }
+
+
+def upsert_posts(updates: Dict[int, Dict]) -> None:
+    """Writes merged updates with INSERT ... ON CONFLICT DO UPDATE statements. Posts sharing
+    the same set of updated columns are written in a single statement. Rows are written in id
+    order so concurrent flushes always lock rows in the same order.
+    """
+    defaults = {
+        field.name: field.get_default()
+        for field in Post._meta.concrete_fields
+        if not field.primary_key
+    }
+    groups = {}
+    feed_ranks = []
+    for post_id in sorted(updates):
+        update = updates[post_id]
+        values = {"id": post_id, **defaults, **update["insert_only"], **update["fields"]}
+        groups.setdefault(tuple(sorted(update["fields"])), []).append(values)
+        feed_ranks += [
+            {"post_id": post_id, "feed": feed, "rank": rank}
+            for feed, rank in sorted(update["feeds"].items())
+        ]
+
+    sentiment_updates = {
+        post_id: update["fields"]["sentiment_score"]
+        for post_id, update in updates.items()
+        if "sentiment_score" in update["fields"]
+    }
+    with transaction.atomic():
+        # Lock posts getting sentiment to read their old sentiment for aggregates
+        old_posts = (
+            Post.objects.select_for_update()
+            .filter(id__in=list(sentiment_updates))
+            .order_by("id")
+            .values("id", "domain", "submitted_by", "rank", "sentiment_score")
+        )
+        sentiment_changes = [
+            (post, post["sentiment_score"], sentiment_updates[post["id"]])
+            for post in old_posts
+        ]
+        for update_columns, rows in groups.items():
+            upsert_rows(Post, ["id"], update_columns, rows)
+        upsert_rows(FeedRank, ["post_id", "feed"], ["rank"], feed_ranks)
+        PostAggregate.fold_sentiment(sentiment_changes)
+
+
+def upsert_rows(
+    model,
+    conflict_columns: List[str],
+    update_columns: Iterable[str],
+    rows: List[Dict],
+    increment_columns: Iterable[str] = (),
+) -> None:
+    """Inserts given rows of the model, updating update_columns of rows conflicting on
+    conflict_columns with inserted values, and adding inserted values to increment_columns.
+    Conflicting rows are left as is if there isn't any column to update.
+    """
+    opts = model._meta
+    qn = connection.ops.quote_name
+    fields = [
+        field
+        for field in opts.concrete_fields
+        if not (field.primary_key and field.attname not in conflict_columns)
+    ]
+    columns = ", ".join(qn(field.column) for field in fields)
+    placeholders = "({})".format(", ".join(["%s"] * len(fields)))
+    assignments = [
+        f"{column} = EXCLUDED.{column}"
+        for column in (qn(opts.get_field(name).column) for name in update_columns)
+    ] + [
+        f"{column} = {qn(opts.db_table)}.{column} + EXCLUDED.{column}"
+        for column in (qn(opts.get_field(name).column) for name in increment_columns)
+    ]
+    conflict_action = "DO NOTHING"
+    if assignments:
+        conflict_action = "DO UPDATE SET " + ", ".join(assignments)
+
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        batch = rows[i:i + UPSERT_BATCH_SIZE]
+        params = [
+            field.get_db_prep_save(values[field.attname], connection)
+            for values in batch
+            for field in fields
+        ]
+        sql = (
+            f"INSERT INTO {qn(opts.db_table)} ({columns}) "
+            f"VALUES {', '.join([placeholders] * len(batch))} "
+            f"ON CONFLICT ({', '.join(qn(column) for column in conflict_columns)}) "
+            f"{conflict_action}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
@@ -0,0 +1,33 @@
+from collections import namedtuple
+from typing import List
+
+from django.conf import settings
+
+# path: Hackernews webpage path of the feed, paginated with ?p=N
+# api_endpoint: Hackernews API endpoint listing post ids of the feed in rank order
+Feed = namedtuple("Feed", ["name", "path", "api_endpoint"])
+
+NEWS = "news"
+NEWEST = "newest"
+ASK = "ask"
+SHOW = "show"
+JOBS = "jobs"
+
+FEEDS = {
+    feed.name: feed
+    for feed in [
+        Feed(NEWS, "news", "topstories"),
+        Feed(NEWEST, "newest", "newstories"),
+        Feed(ASK, "ask", "askstories"),
+        Feed(SHOW, "show", "showstories"),
+        Feed(JOBS, "jobs", "jobstories"),
+    ]
+}
+FEED_CHOICES = [(name, name.capitalize()) for name in FEEDS]
+
+# Post.rank keeps the rank of the post in this feed, ranks in other feeds are kept in FeedRank
+PRIMARY_FEED = NEWS
+
+
+def crawled_feeds() -> List[Feed]:
+    return [FEEDS[name] for name in settings.CRAWL_FEEDS]
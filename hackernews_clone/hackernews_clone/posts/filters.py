@@ -0,0 +1,31 @@
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+
+class PostFilter(filters.BaseFilterBackend):
+    """Filters posts by `submitted_by`, `domain`, and sentiment score range given by
+    `sentiment_min` and `sentiment_max` query parameters.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if params.get("submitted_by"):
+            queryset = queryset.filter(submitted_by=params["submitted_by"])
+        if params.get("domain"):
+            queryset = queryset.filter(domain=params["domain"].lower())
+        if params.get("sentiment_min"):
+            queryset = queryset.filter(
+                sentiment_score__gte=self.get_float(params, "sentiment_min")
+            )
+        if params.get("sentiment_max"):
+            queryset = queryset.filter(
+                sentiment_score__lte=self.get_float(params, "sentiment_max")
+            )
+        return queryset
+
+    @staticmethod
+    def get_float(params, name):
+        try:
+            return float(params[name])
+        except ValueError:
+            raise ValidationError({name: "A valid number is required."})
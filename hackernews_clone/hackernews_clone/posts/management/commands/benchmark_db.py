@@ -0,0 +1,70 @@
+import time
+
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.core.management.base import BaseCommand
+
+from hackernews_clone.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark of persistent connections. Runs the db query of a fetch_sentiment "
+        "task once per crawled post in this process, closing old connections around each "
+        "query the way celery workers do around each task, and reports queries per second "
+        "and db connections opened, without and with persistent connections. Celery workers "
+        "and the tasks themselves aren't run, use the configured database (and pgbouncer) "
+        "for numbers comparable to a deployment."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queries", type=int, default=500, help="Number of queries, one per crawled post."
+        )
+        parser.add_argument(
+            "--conn-max-age",
+            type=int,
+            default=None,
+            help="CONN_MAX_AGE to compare with 0. Configured value by default.",
+        )
+
+    def handle(self, *args, **options):
+        conn_max_age = options["conn_max_age"]
+        if conn_max_age is None:
+            conn_max_age = connections["default"].settings_dict["CONN_MAX_AGE"]
+
+        self.stdout.write(f"{'CONN_MAX_AGE':<14}{'queries/sec':>12}{'connections':>13}")
+        for max_age in sorted({0, conn_max_age}):
+            queries_per_second, connection_count = self.run_queries(
+                options["queries"], max_age
+            )
+            self.stdout.write(
+                f"{max_age:<14}{queries_per_second:>12.1f}{connection_count:>13}"
+            )
+
+    def run_queries(self, query_count, conn_max_age):
+        """Runs the db query of a fetch_sentiment task for each post, closing old connections
+        before and after each query the way celery does around each task in workers.
+        """
+        connection = connections["default"]
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        try:
+            start = time.perf_counter()
+            for post_id in range(query_count):
+                close_old_connections()
+                Post.objects.filter(id=post_id, sentiment_score__isnull=False).exists()
+                close_old_connections()
+            elapsed = time.perf_counter() - start
+        finally:
+            connection_created.disconnect(count_connection)
+            connection.close()
+
+        return query_count / elapsed, len(opened)
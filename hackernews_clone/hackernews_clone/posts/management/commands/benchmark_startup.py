@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules each process role imports until it is ready to serve its first request or task.
+# Workers import tasks module through celery autodiscovery, then the modules imported by the
+# tasks of their queue.
+ROLES = {
+    "web": ["hackernews_clone.urls"],
+    "main_queue": ["hackernews_clone.posts.tasks", "requests"],
+    "scrap_page_queue": [
+        "hackernews_clone.posts.tasks",
+        "requests",
+        "hackernews_clone.posts.scrapper",
+    ],
+    "persist_queue": ["hackernews_clone.posts.tasks"],
+    "sentiment_queue": [
+        "hackernews_clone.posts.tasks",
+        "ibm_cloud_sdk_core.api_exception",
+        "hackernews_clone.posts.sentiment",
+    ],
+}
+
+# Heavy libraries reported as loaded or not for each role
+HEAVY_MODULES = ["requests", "bs4", "ibm_watson", "ibm_cloud_sdk_core"]
+
+STARTUP_SCRIPT = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": list(sys.modules),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measures startup time and memory of each web and worker process role."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "roles", nargs="*", help=f"Roles to measure, one of {', '.join(ROLES)}. All by default."
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'role':<18}{'startup (s)':>12}{'max rss (MB)':>14}{'modules':>9}  heavy modules"
+        )
+        unknown_roles = set(options["roles"]) - set(ROLES)
+        if unknown_roles:
+            raise CommandError(f"Unknown roles: {', '.join(sorted(unknown_roles))}")
+
+        for role in options["roles"] or ROLES:
+            runs = [self.run_role(role) for _ in range(options["repeat"])]
+            seconds = sorted(run["seconds"] for run in runs)[len(runs) // 2]
+            max_rss = max(run["max_rss_kb"] for run in runs) / 1024
+            loaded = [module for module in HEAVY_MODULES if module in runs[0]["modules"]]
+            self.stdout.write(
+                f"{role:<18}{seconds:>12.3f}{max_rss:>14.1f}{len(runs[0]['modules']):>9}"
+                f"  {', '.join(loaded) or '-'}"
+            )
+
+    def run_role(self, role):
+        """Runs a fresh interpreter importing modules of given role, so nothing imported by
+        this process affects the measurement.
+        """
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, *ROLES[role]],
+            env=os.environ.copy(),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        return json.loads(output.splitlines()[-1])
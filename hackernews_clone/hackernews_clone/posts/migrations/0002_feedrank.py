@@ -0,0 +1,39 @@
+# Generated by Django 3.1.4 on 2026-10-19 11:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='rank',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FeedRank',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(choices=[('news', 'News'), ('newest', 'Newest'), ('ask', 'Ask'), ('show', 'Show'), ('jobs', 'Jobs')], max_length=6)),
+                ('rank', models.IntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_ranks', to='posts.post')),
+            ],
+            options={
+                'ordering': ['feed', 'rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedrank',
+            index=models.Index(fields=['feed', 'rank'], name='posts_feedr_feed_f6c623_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedrank',
+            constraint=models.UniqueConstraint(fields=('post', 'feed'), name='unique_post_feed'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.4 on 2026-10-19 11:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_celery_beat', '0014_remove_clockedschedule_enabled'),
+        ('posts', '0002_feedrank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpdateSyncTracker',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('idle', 'Idle'), ('active', 'Active'), ('failed', 'Failed')], default='idle', max_length=7)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_finish_at', models.DateTimeField(blank=True, null=True)),
+                ('max_item', models.IntegerField(blank=True, null=True)),
+                ('periodic_task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='django_celery_beat.periodictask')),
+            ],
+            options={
+                'db_table': 'update_sync_tracker',
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.1.4 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_updatesynctracker'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='post',
+            name='age',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='domain',
+            field=models.CharField(blank=True, max_length=253, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['score'], name='post_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['submitted_at'], name='post_submitted_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['num_of_comments'], name='post_comments_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['sentiment_score'], name='post_sentiment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['submitted_by', 'submitted_at'], name='post_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['domain', 'submitted_at'], name='post_domain_time_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.4 on 2026-10-19 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_submitted_at_domain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostAggregate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('domain', 'Domain'), ('submitted_by', 'Submitted By'), ('rank_bucket', 'Rank Bucket')], max_length=12)),
+                ('key', models.CharField(max_length=253)),
+                ('post_count', models.IntegerField(default=0)),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('score_count', models.IntegerField(default=0)),
+                ('sentiment_sum', models.FloatField(default=0)),
+                ('sentiment_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['dimension', '-post_count'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postaggregate',
+            index=models.Index(fields=['dimension', '-post_count'], name='posts_posta_dimensi_72ce77_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='postaggregate',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='unique_dimension_key'),
+        ),
+    ]
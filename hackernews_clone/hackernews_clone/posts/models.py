@@ -1,16 +1,22 @@
+from collections import defaultdict
 from datetime import datetime, timezone
 
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
+from django.db import connection, models, transaction
+from django.db.models import CharField, Count, F, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 from django_celery_beat.models import PeriodicTask
 
+from hackernews_clone.posts.feeds import FEED_CHOICES
+
 
 class Post(models.Model):
     id = models.IntegerField(primary_key=True)
-    rank = models.IntegerField()
+    rank = models.IntegerField(null=True, blank=True)
     subject = models.TextField()
     url = models.TextField()
-    age = models.CharField(max_length=15)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    domain = models.CharField(max_length=253, null=True, blank=True)
     score = models.IntegerField(null=True, blank=True)
     submitted_by = models.CharField(max_length=15, null=True, blank=True)
     num_of_comments = models.IntegerField(null=True, blank=True)
@@ -21,9 +27,182 @@ class Post(models.Model):
         ordering = ["rank"]
         indexes = [
             models.Index(fields=["rank"]),
+            # Sorting indexes of PostList, see PostList.ordering_fields
+            models.Index(fields=["score"], name="post_score_idx"),
+            models.Index(fields=["submitted_at"], name="post_submitted_at_idx"),
+            models.Index(fields=["num_of_comments"], name="post_comments_idx"),
+            # Sentiment range filter, also used when sorting by sentiment
+            models.Index(fields=["sentiment_score"], name="post_sentiment_idx"),
+            # Filtering by user or domain, ordered by recency
+            models.Index(
+                fields=["submitted_by", "submitted_at"], name="post_user_time_idx"
+            ),
+            models.Index(fields=["domain", "submitted_at"], name="post_domain_time_idx"),
         ]
 
 
+class FeedRank(models.Model):
+    """Rank of a post in a Hackernews feed. A post may be listed in several feeds."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="feed_ranks")
+    feed = models.CharField(max_length=6, choices=FEED_CHOICES)
+    rank = models.IntegerField()
+
+    class Meta:
+        ordering = ["feed", "rank"]
+        constraints = [
+            models.UniqueConstraint(fields=["post", "feed"], name="unique_post_feed"),
+        ]
+        indexes = [
+            models.Index(fields=["feed", "rank"]),
+        ]
+
+
+class PostAggregate(models.Model):
+    """Precomputed post statistics grouped by domain, submitter or rank bucket. Sums and
+    counts are kept instead of averages, so sentiment arriving after a crawl is folded in
+    without recomputing.
+    """
+    DOMAIN = "domain"
+    SUBMITTED_BY = "submitted_by"
+    RANK_BUCKET = "rank_bucket"
+    DIMENSION_CHOICES = [
+        (DOMAIN, "Domain"),
+        (SUBMITTED_BY, "Submitted By"),
+        (RANK_BUCKET, "Rank Bucket"),
+    ]
+    # A rank bucket is a Hackernews page
+    RANK_BUCKET_SIZE = 30
+
+    dimension = models.CharField(max_length=12, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=253)
+    post_count = models.IntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_count = models.IntegerField(default=0)
+    sentiment_sum = models.FloatField(default=0)
+    sentiment_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["dimension", "-post_count"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "key"], name="unique_dimension_key"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["dimension", "-post_count"]),
+        ]
+
+    @property
+    def average_score(self):
+        return self.score_sum / self.score_count if self.score_count else None
+
+    @property
+    def average_sentiment(self):
+        return self.sentiment_sum / self.sentiment_count if self.sentiment_count else None
+
+    @classmethod
+    def dimension_keys(cls):
+        """Returns expressions computing the aggregate key of a post for each dimension."""
+        return {
+            cls.DOMAIN: F("domain"),
+            cls.SUBMITTED_BY: F("submitted_by"),
+            cls.RANK_BUCKET: Cast(
+                (F("rank") - 1) / Value(cls.RANK_BUCKET_SIZE) + 1, output_field=CharField()
+            ),
+        }
+
+    @classmethod
+    def post_keys(cls, post):
+        """Returns aggregate keys of given post values by dimension."""
+        keys = {cls.DOMAIN: post["domain"], cls.SUBMITTED_BY: post["submitted_by"]}
+        if post["rank"] is not None:
+            keys[cls.RANK_BUCKET] = str((post["rank"] - 1) // cls.RANK_BUCKET_SIZE + 1)
+        return {dimension: key for dimension, key in keys.items() if key is not None}
+
+    @classmethod
+    def refresh(cls):
+        """Recomputes all aggregates from posts. Old aggregates are replaced in a single
+        transaction, so readers keep reading them until new ones are committed.
+
+        Aggregates table is locked against writes before posts are read. Refresh waits for
+        folds already writing to it to commit, and reads their sentiment from posts. Folds
+        starting later wait for the refresh to commit and are applied on top of it, whether
+        their aggregate exists or not, instead of being overwritten.
+        """
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Conflicts with the row exclusive lock taken by folds, and with itself
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"LOCK TABLE {connection.ops.quote_name(cls._meta.db_table)} "
+                        "IN SHARE ROW EXCLUSIVE MODE"
+                    )
+            aggregates = []
+            for dimension, key in cls.dimension_keys().items():
+                rows = (
+                    Post.objects.order_by()
+                    .values(aggregate_key=key)
+                    .exclude(aggregate_key=None)
+                    .annotate(
+                        post_count=Count("id"),
+                        score_sum=Coalesce(Sum("score"), 0),
+                        score_count=Count("score"),
+                        sentiment_sum=Coalesce(Sum("sentiment_score"), Value(0.0)),
+                        sentiment_count=Count("sentiment_score"),
+                    )
+                )
+                aggregates += [
+                    cls(dimension=dimension, key=row.pop("aggregate_key"), **row)
+                    for row in rows
+                ]
+
+            cls.objects.all().delete()
+            cls.objects.bulk_create(aggregates, batch_size=1000)
+
+    @classmethod
+    def fold_sentiment(cls, changes):
+        """Applies sentiment changes of posts to aggregates. changes is a list of
+        (post values, old sentiment score, new sentiment score) tuples. Aggregates of keys
+        appearing after the last refresh are created with sentiment only, their posts and
+        scores are counted on the next refresh.
+        """
+        # Imported here since buffer module writes posts through this model
+        from hackernews_clone.posts.buffer import upsert_rows
+
+        deltas = defaultdict(lambda: [0.0, 0])
+        for post, old_score, new_score in changes:
+            sum_delta = (new_score or 0) - (old_score or 0)
+            count_delta = (new_score is not None) - (old_score is not None)
+            if not sum_delta and not count_delta:
+                continue
+            for dimension, key in cls.post_keys(post).items():
+                deltas[dimension, key][0] += sum_delta
+                deltas[dimension, key][1] += count_delta
+
+        defaults = {
+            field.name: field.get_default()
+            for field in cls._meta.concrete_fields
+            if not field.primary_key
+        }
+        # Upsert in key order so concurrent folds lock rows in the same order
+        upsert_rows(
+            cls,
+            ["dimension", "key"],
+            [],
+            [
+                {
+                    **defaults,
+                    "dimension": dimension,
+                    "key": key,
+                    "sentiment_sum": sum_delta,
+                    "sentiment_count": count_delta,
+                }
+                for (dimension, key), (sum_delta, count_delta) in sorted(deltas.items())
+            ],
+            increment_columns=["sentiment_sum", "sentiment_count"],
+        )
+
+
 class BaseTracker(models.Model):
     """Keeps track of update with hackernews.
     """
@@ -36,6 +215,9 @@ class BaseTracker(models.Model):
         (FAILED, "Failed"),
     ]
 
+    # Whether post aggregates are recomputed when a run finishes
+    REFRESH_AGGREGATES = True
+
     periodic_task = models.OneToOneField(PeriodicTask, on_delete=models.CASCADE)
     status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=IDLE)
     last_run_at = models.DateTimeField(null=True, blank=True)
@@ -58,6 +240,13 @@ class BaseTracker(models.Model):
 
     @classmethod
     def finish(cls):
+        # Refresh before releasing, so aggregates are up to date once UI is released
+        if cls.REFRESH_AGGREGATES:
+            try:
+                PostAggregate.refresh()
+            except Exception as err:
+                cls.fail()
+                raise err
         with transaction.atomic():
             st = cls.objects.select_for_update().get(pk=1)
             st.status = cls.IDLE
@@ -94,3 +283,16 @@ class ScrapperTracker(BaseTracker):
 class APIFetcherTracker(BaseTracker):
     class Meta(BaseTracker.Meta):
         db_table = "api_fetcher_tracker"
+
+
+class UpdateSyncTracker(BaseTracker):
+    """Keeps track of syncing with Hackernews API updates stream. max_item is the largest item
+    id seen on the last sync, items with a larger id are new on the next one.
+    """
+    # Syncs run every few seconds, aggregates are refreshed by full crawls
+    REFRESH_AGGREGATES = False
+
+    max_item = models.IntegerField(null=True, blank=True)
+
+    class Meta(BaseTracker.Meta):
+        db_table = "update_sync_tracker"
@@ -0,0 +1,159 @@
+import hashlib
+import math
+import random
+import time
+
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from kombu.exceptions import ChannelError
+
+from hackernews_clone.celery import app
+from hackernews_clone.posts.models import Post
+
+SENTIMENT_QUEUE = "sentiment_queue"
+# Posts visible on the first page are scored on a separate queue with its own worker, so
+# they don't wait behind the rest of a crawl
+SENTIMENT_FAST_QUEUE = "sentiment_fast_queue"
+# Redis transport consumes lower priority values first
+MAX_PRIORITY = 9
+
+# Set while a sentiment task of the post is queued, deferred or being retried
+INFLIGHT_KEY = "posts:sentiment:inflight:{}"
+# Set while a sentiment task is calling the provider for the url
+URL_LOCK_KEY = "posts:sentiment:url-lock:{}"
+URL_RESULT_KEY = "posts:sentiment:url-result:{}"
+# Holds the time the provider asked us to wait until after rate limiting us
+RATE_LIMITED_KEY = "posts:sentiment:rate-limited"
+
+
+def best_rank(post: Dict) -> int:
+    """Returns the best rank of the post among the feeds it's listed in."""
+    return min(post["feeds"].values())
+
+
+def sentiment_route(post: Dict) -> Dict:
+    """Returns queue and priority options of fetch_sentiment task for given post, posts with
+    better rank are consumed first.
+    """
+    rank = best_rank(post)
+    if rank <= settings.SENTIMENT_FAST_LANE_MAX_RANK:
+        return {"queue": SENTIMENT_FAST_QUEUE, "priority": 0}
+    priority = (rank - 1) * (MAX_PRIORITY + 1) // settings.SENTIMENT_MAX_RANK
+    return {"queue": SENTIMENT_QUEUE, "priority": min(priority, MAX_PRIORITY)}
+
+
+class SentimentScheduler:
+    """Selects posts of a crawl to fetch sentiment for, spending at most
+    SENTIMENT_BUDGET_PER_CRAWL sentiment calls on the best ranked posts.
+
+    Posts already having sentiment, posts already selected in the crawl, and posts ranked
+    worse than SENTIMENT_MAX_RANK, which are likely to drop off before they are scored, are
+    skipped.
+    """
+
+    def __init__(self, budget: int = None):
+        self.budget = settings.SENTIMENT_BUDGET_PER_CRAWL if budget is None else budget
+        self.seen_ids = set()
+        self.spent = 0
+
+    def select(self, posts: Iterable[Dict]) -> List[Dict]:
+        """Returns posts to fetch sentiment for among given posts, best ranked first."""
+        candidates = {}
+        for post in posts:
+            if post["id"] in self.seen_ids:
+                continue
+            if post["id"] in candidates:
+                # Same post listed in several feeds, keep all ranks to find its best rank
+                candidates[post["id"]]["feeds"].update(post["feeds"])
+            else:
+                candidates[post["id"]] = {**post, "feeds": dict(post["feeds"])}
+        self.seen_ids.update(candidates)
+
+        scored_ids = set(
+            Post.objects.filter(
+                id__in=list(candidates), sentiment_score__isnull=False
+            ).values_list("id", flat=True)
+        )
+        selected = sorted(
+            (
+                post
+                for post_id, post in candidates.items()
+                if post_id not in scored_ids
+                and best_rank(post) <= settings.SENTIMENT_MAX_RANK
+            ),
+            key=best_rank,
+        )[:max(self.budget - self.spent, 0)]
+        self.spent += len(selected)
+        return selected
+
+
+def claim_inflight(post_id: int) -> bool:
+    """Marks sentiment of the post with given id in flight. Returns False if it's already in
+    flight, in which case it must not be enqueued again.
+    """
+    return cache.add(
+        INFLIGHT_KEY.format(post_id), 1, timeout=settings.SENTIMENT_INFLIGHT_TIMEOUT
+    )
+
+
+def release_inflight(post_id: int) -> None:
+    cache.delete(INFLIGHT_KEY.format(post_id))
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+def queue_depth(queue: str) -> int:
+    """Returns number of messages waiting in given queue, of all priorities."""
+    with app.connection_for_read() as conn:
+        try:
+            return conn.default_channel.queue_declare(
+                queue=queue, passive=True
+            ).message_count
+        except ChannelError:
+            # Queue doesn't exist until first message is sent to it
+            return 0
+
+
+def sentiment_queue_capacity() -> int:
+    """Returns number of sentiment tasks that can be enqueued to SENTIMENT_QUEUE before it's
+    saturated. No capacity is left while provider is rate limiting us.
+    """
+    if rate_limited_countdown() is not None:
+        return 0
+    return max(settings.SENTIMENT_QUEUE_HIGH_WATERMARK - queue_depth(SENTIMENT_QUEUE), 0)
+
+
+def rate_limited_countdown() -> Optional[int]:
+    """Returns seconds left until provider accepts sentiment calls again, or None if it isn't
+    rate limiting us.
+    """
+    rate_limited_until = cache.get(RATE_LIMITED_KEY)
+    if rate_limited_until is None:
+        return None
+    return max(math.ceil(rate_limited_until - time.time()), 0)
+
+
+def sentiment_retry_countdown(
+    code: Optional[int], headers: Dict, retries: int
+) -> Optional[int]:
+    """Returns seconds to wait before retrying a failed sentiment call, or None if the failure
+    isn't worth retrying.
+
+    Rate limited calls wait for Retry-After the provider sent, if any, and mark all sentiment
+    enqueueing rate limited until then. Server errors and connection failures (no code) back
+    off exponentially. Other client errors, e.g. unsupported document, aren't retried.
+    """
+    # Random jitter added to prevent a Thundering Herd Problem
+    backoff = int(random.uniform(3, 4) ** retries)
+    if code == 429:
+        retry_after = headers.get("Retry-After", "")
+        countdown = int(retry_after) if retry_after.isdigit() else backoff
+        cache.set(RATE_LIMITED_KEY, time.time() + countdown, timeout=countdown)
+        return countdown + random.randint(0, settings.SENTIMENT_BACKPRESSURE_DELAY)
+    if code is None or code >= 500:
+        return backoff
+    return None
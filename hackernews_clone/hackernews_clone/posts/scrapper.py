@@ -0,0 +1,65 @@
+import logging
+import re
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+from hackernews_clone.posts.utils import get_domain, parse_submitted_at
+
+logger = logging.getLogger(__name__)
+
+
+def scrap_posts(content):
+    """Parses posts listed on given Hackernews page content. Rows that can't be parsed, e.g.
+    laid out differently on some feeds, are skipped.
+    """
+    posts = []
+    soup = BeautifulSoup(content, "html.parser")
+    rows = soup.find_all("tr", class_="athing")
+    for row in rows:
+        try:
+            posts.append(scrap_post(row))
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping row of post {row.get('id')}, it failed to be parsed")
+
+    return posts
+
+
+def scrap_post(row):
+    """Parses a post from its row and the footer row following it."""
+    post_id = int(row["id"])
+    rank = int(row.find(class_="rank").string[:-1])
+    url = row.find(class_="storylink").get("href")
+    url = (
+        url
+        if url.startswith("http")
+        else f"{settings.HACKERNEWS_URL}{url}"
+    )
+    subject = row.find(class_="storylink").string
+
+    footer = row.next_sibling
+    submitted_at = parse_submitted_at(footer.find(class_="age")["title"])
+
+    score, submitted_by, num_of_comments = None, None, None
+    score_el = footer.find(class_="score")
+    # If score element exists, parse score and submitted_by
+    if score_el:
+        score = int(score_el.string.replace(" points", ""))
+        footer_els = footer.select(".subtext > a")
+        submitted_by = footer_els[0].string
+        # Check if comments exist, and parse it
+        res = re.match(r"(\d+)\xa0comment", footer_els[2].string)
+        if res:
+            num_of_comments = int(res[1])
+
+    return {
+        "id": post_id,
+        "rank": rank,
+        "url": url,
+        "subject": subject,
+        "submitted_at": submitted_at.isoformat(),
+        "domain": get_domain(url),
+        "score": score,
+        "submitted_by": submitted_by,
+        "num_of_comments": num_of_comments,
+    }
@@ -1,9 +1,24 @@
+from django.utils.timesince import timesince
 from rest_framework import serializers
 
-from hackernews_clone.posts.models import Post
+from hackernews_clone.posts.models import Post, PostAggregate
 
 
 class PostSerializer(serializers.ModelSerializer):
+    age = serializers.SerializerMethodField()
+
     class Meta:
         model = Post
         fields = "__all__"
+
+    def get_age(self, obj):
+        """Returns time passed since submission in its largest unit, e.g. "3 hours ago"."""
+        if obj.submitted_at is None:
+            return None
+        return f"{timesince(obj.submitted_at).split(',')[0]} ago".replace("\xa0", " ")
+
+
+class PostAggregateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PostAggregate
+        fields = ["dimension", "key", "post_count", "average_score", "average_sentiment"]
@@ -1,113 +1,278 @@
 import random
-import requests
 import time
 
-from datetime import datetime
-from typing import Dict, Tuple, List
-
-import timeago
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Tuple, List, Optional, Set
 
 from celery import group
-from celery.exceptions import MaxRetriesExceededError
 from celery.result import allow_join_result, AsyncResult, GroupResult
 from celery.utils.log import get_task_logger
 from django.conf import settings
-from ibm_cloud_sdk_core.api_exception import ApiException
+from django.core.cache import cache
+from django.db import DatabaseError
 
 from hackernews_clone.celery import app
-from hackernews_clone.posts.models import Post, ScrapperTracker, APIFetcherTracker
-from hackernews_clone.posts.utils import get_sentiment, scrap_posts
+from hackernews_clone.posts.buffer import (
+    API,
+    POST_FIELDS,
+    SCRAPPER,
+    SENTIMENT,
+    PostUpdateBuffer,
+    post_update_fields,
+)
+from hackernews_clone.posts.feeds import FEEDS, PRIMARY_FEED, crawled_feeds
+from hackernews_clone.posts.models import (
+    Post,
+    FeedRank,
+    ScrapperTracker,
+    APIFetcherTracker,
+    UpdateSyncTracker,
+)
+from hackernews_clone.posts.scheduling import (
+    SENTIMENT_FAST_QUEUE,
+    URL_LOCK_KEY,
+    URL_RESULT_KEY,
+    SentimentScheduler,
+    claim_inflight,
+    rate_limited_countdown,
+    release_inflight,
+    sentiment_queue_capacity,
+    sentiment_retry_countdown,
+    sentiment_route,
+    url_key,
+)
+from hackernews_clone.posts.utils import get_domain
 
 logger = get_task_logger(__name__)
 
+# Scrapping (bs4), sentiment (ibm_watson) and http (requests) libraries are imported in the
+# tasks using them, so web processes and workers of other queues don't load them.
+
+UPDATE_SYNC_LOCK_KEY = "posts:update-sync-lock"
+# Seconds after which sync lock is released even if its holder died
+UPDATE_SYNC_LOCK_TIMEOUT = 60
+
 
 @app.task(bind=True, queue="sentiment_queue")
 def fetch_sentiment(self, post: Dict) -> None:
     """Checks post with a given id already persisted with sentiment if not, gets sentiment
     for given url and update sentiment_score and sentiment_label of the post with given id.
+
+    Only one task calls the provider for a url at a time, others wait for its result, which
+    is cached for SENTIMENT_RESULT_TIMEOUT. While provider is rate limiting us, the task is
+    deferred until it accepts calls again. Post is released from in flight once its
+    sentiment is written or given up on, not while it's being retried.
     """
+    import requests
+    from ibm_cloud_sdk_core.api_exception import ApiException
+
+    from hackernews_clone.posts.sentiment import get_sentiment
+
     post_query = Post.objects.filter(id=post["id"], sentiment_score__isnull=False)
     url = post["url"]
-    if not post_query.exists():
+    if post_query.exists():
+        release_inflight(post["id"])
+        return
+
+    result_key = URL_RESULT_KEY.format(url_key(url))
+    result = cache.get(result_key)
+    if result is None:
+        rate_limit_countdown = rate_limited_countdown()
+        if rate_limit_countdown is not None:
+            logger.info(f"Sentiment provider is rate limiting, deferring {url}")
+            # Deferring isn't a failure either, jitter spreads deferred tasks over time
+            fetch_sentiment.apply_async(
+                (post,),
+                countdown=rate_limit_countdown
+                + random.randint(0, settings.SENTIMENT_BACKPRESSURE_DELAY),
+                **sentiment_route(post),
+            )
+            return
+
+        lock_key = URL_LOCK_KEY.format(url_key(url))
+        if not cache.add(lock_key, 1, timeout=settings.SENTIMENT_INFLIGHT_TIMEOUT):
+            logger.info(f"Sentiment for {url} is being fetched, waiting for it")
+            # Waiting for another task isn't a failure, so it's not counted as a retry
+            fetch_sentiment.apply_async(
+                (post,),
+                countdown=settings.SENTIMENT_BACKPRESSURE_DELAY,
+                **sentiment_route(post),
+            )
+            return
+
         logger.info(f"Getting sentiment for {url}")
         try:
-            sentiment_score, sentiment_label = get_sentiment(url)
-        except ApiException as exc:
-            try:
-                logger.info(f"Retrying to get sentiment for {url}")
-                # Random jitter added to prevent a Thundering Herd Problem
-                self.retry(countdown=int(random.uniform(3, 4) ** self.request.retries))
-            except MaxRetriesExceededError:
-                sentiment_score = None
-                sentiment_label = exc.message
-
-        # Just to get slight better performance use update only sentiment fields instead of
-        # directly calling update or create. Almost in all cases post creation should
-        # happen before sentiment call is done
-        if Post.objects.filter(id=post["id"]).exists():
-            Post.objects.filter(id=post["id"]).update(
-                sentiment_score=sentiment_score, sentiment_label=sentiment_label
-            )
+            result = get_sentiment(url)
+            cache.set(result_key, result, timeout=settings.SENTIMENT_RESULT_TIMEOUT)
+        except (ApiException, requests.exceptions.RequestException) as exc:
+            if isinstance(exc, ApiException):
+                code, message = exc.code, exc.message
+                headers = exc.http_response.headers if exc.http_response is not None else {}
+            else:
+                # Connection failures and timeouts are raised by requests as is
+                code, message, headers = None, str(exc), {}
+            countdown = sentiment_retry_countdown(code, headers, self.request.retries)
+            if countdown is not None and self.request.retries < self.max_retries:
+                logger.info(f"Retrying to get sentiment for {url} in {countdown} seconds")
+                raise self.retry(countdown=countdown, exc=exc)
+            result = (None, message)
+        except Exception:
+            release_inflight(post["id"])
+            raise
+        finally:
+            cache.delete(lock_key)
+
+    sentiment_score, sentiment_label = result
+    # Sentiment fields are written whether post exists or not, post fields this task
+    # carries are used only to create the post in case persist didn't happen yet
+    buffer_post_update(
+        post["id"],
+        SENTIMENT,
+        {"sentiment_score": sentiment_score, "sentiment_label": sentiment_label},
+        insert_only={field: post[field] for field in POST_FIELDS},
+    )
+    release_inflight(post["id"])
+
+
+def enqueue_sentiment(posts: List[Dict]) -> None:
+    """Enqueues fetch_sentiment tasks for given posts, skipping posts whose sentiment is
+    already in flight.
+    """
+    claimed_posts = [post for post in posts if claim_inflight(post["id"])]
+    if claimed_posts:
+        dispatch_sentiment(claimed_posts)
+
+
+@app.task(queue="main_queue", ignore_result=True)
+def dispatch_sentiment(posts: List[Dict]) -> None:
+    """Sends fetch_sentiment tasks of given in flight posts to their queues in given order.
+    Posts on the fast lane are sent unless provider is rate limiting us, others are sent as
+    long as sentiment_queue has capacity. The rest is deferred for
+    SENTIMENT_BACKPRESSURE_DELAY seconds.
+    """
+    capacity = sentiment_queue_capacity()
+    is_rate_limited = rate_limited_countdown() is not None
+    deferred_posts = []
+    for post in posts:
+        route = sentiment_route(post)
+        if route["queue"] == SENTIMENT_FAST_QUEUE and not is_rate_limited:
+            fetch_sentiment.apply_async((post,), **route)
+        elif capacity > 0:
+            fetch_sentiment.apply_async((post,), **route)
+            capacity -= 1
         else:
-            Post.objects.update_or_create(
-                id=post["id"],
-                defaults={
-                    "url": post["url"],
-                    "subject": post["subject"],
-                    "submitted_by": post["submitted_by"],
-                    "rank": post["rank"],
-                    "score": post["score"],
-                    "age": post["age"],
-                    "num_of_comments": post["num_of_comments"],
-                    "sentiment_score": sentiment_score,
-                    "sentiment_label": sentiment_label,
-                },
-            )
+            deferred_posts.append(post)
 
+    if deferred_posts:
+        logger.info(f"Sentiment queue is saturated, deferring {len(deferred_posts)} posts")
+        dispatch_sentiment.apply_async(
+            (deferred_posts,), countdown=settings.SENTIMENT_BACKPRESSURE_DELAY
+        )
 
-@app.task(bind=True, queue="persist_queue")
-def persist(self, post_info: Dict) -> None:
-    """Creates or updates post.
+
+@app.task(queue="persist_queue")
+def persist(post_info: Dict, source: str = SCRAPPER) -> None:
+    """Buffers post information to be created or updated on next flush of PostUpdateBuffer.
     Edge case race condition: Hackernews post grabbed by persist worker and change its page
     on hackernews and regrabbed by another persist worker.
 
     Hackernews may contain duplicated posts with different ranks, in this case we only keep
-    the latter post.
+    the latter post. Post listed in several feeds is written once per flush with ranks of all
+    feeds it's buffered with.
     """
-    post, created = Post.objects.update_or_create(
-        id=post_info["id"],
-        defaults={
-            "url": post_info["url"],
-            "subject": post_info["subject"],
-            "submitted_by": post_info["submitted_by"],
-            "rank": post_info["rank"],
-            "score": post_info["score"],
-            "age": post_info["age"],
-            "num_of_comments": post_info["num_of_comments"],
-        },
+    feeds = post_info["feeds"]
+    buffer_post_update(
+        post_info["id"],
+        ":".join([source, *sorted(feeds)]),
+        post_update_fields(post_info),
+        feeds=feeds,
     )
-    if created:
-        logger.info(f"Post {post.id} created")
-    else:
-        logger.info(f"Post {post.id} updated")
+    logger.info(f"Post {post_info['id']} buffered")
+
+
+@app.task(bind=True, queue="persist_queue", ignore_result=True)
+def flush_post_updates(self) -> None:
+    """Writes all buffered post updates to db in a single batch. Updates failed to be written
+    are restored to the buffer and the flush is retried.
+    """
+    try:
+        PostUpdateBuffer().flush()
+    except DatabaseError as exc:
+        raise self.retry(countdown=settings.POST_UPDATE_BUFFER_WINDOW, exc=exc)
+
+
+def buffer_post_update(
+    post_id: int,
+    source: str,
+    fields: Dict,
+    insert_only: Optional[Dict] = None,
+    feeds: Optional[Dict[str, int]] = None,
+) -> None:
+    """Adds update to PostUpdateBuffer and schedules a flush at the end of the buffer window
+    if there isn't one scheduled already.
+    """
+    if PostUpdateBuffer().add(post_id, source, fields, insert_only, feeds):
+        flush_post_updates.apply_async(countdown=settings.POST_UPDATE_BUFFER_WINDOW)
+
+
+def select_sentiment_post_ids(post_feeds: Dict[int, Dict[str, int]]) -> Set[int]:
+    """Returns ids of posts to fetch sentiment for among posts with given feed ranks."""
+    return {
+        post["id"]
+        for post in SentimentScheduler().select(
+            {"id": post_id, "feeds": feeds} for post_id, feeds in post_feeds.items()
+        )
+    }
+
+
+def prune_posts(feed_post_ids: Dict[str, Set[int]]) -> None:
+    """Deletes posts not listed in any of the crawled feeds, and feed ranks of posts that
+    dropped off a crawled feed.
+    """
+    post_ids = set().union(*feed_post_ids.values())
+    Post.objects.exclude(id__in=list(post_ids)).delete()
+    for feed, ids in feed_post_ids.items():
+        FeedRank.objects.filter(feed=feed).exclude(post_id__in=list(ids)).delete()
+    if PRIMARY_FEED in feed_post_ids:
+        Post.objects.exclude(id__in=list(feed_post_ids[PRIMARY_FEED])).exclude(
+            rank=None
+        ).update(rank=None)
 
 
 @app.task(queue="main_queue", ignore_result=True)
 def scrap_from_web() -> None:
-    """Orchestrate scrapping hackernews pages.
-    Fires MAX_PAGE_TO_SCRAP_IN_PARALEL number of scrap_page tasks in a group,
-    waits for group results. Repeats this until hackernews doesn't have any more page to scrap.
-    Then waits for all persist tasks fired by scrap_page task to finish.
+    """Orchestrate scrapping hackernews pages of crawled feeds.
+    Every round fires MAX_PAGE_TO_SCRAP_IN_PARALEL number of scrap_page tasks for each feed
+    having more pages in a single group, so pages of all feeds are sharded across
+    scrap_page_queue workers, and waits for group results. Repeats this until none of the
+    feeds has any more page to scrap. A feed has no more pages once one of its pages lists no
+    post not scrapped already in the crawl, e.g. it's empty or the feed ignores ?p=N and
+    serves the same page again, or MAX_PAGE_TO_SCRAP_PER_FEED pages are scrapped. Then waits
+    for all persist tasks fired by scrap_page task to finish.
+
+    Sentiment is fetched by SentimentScheduler after each round, in rank order and within
+    the sentiment budget of the crawl, so first pages are scored first. Post listed in
+    several feeds is sent to sentiment only once.
     """
     ScrapperTracker.activate()
-    page_index = 1
-    page_end = settings.MAX_PAGE_TO_SCRAP_IN_PARALEL + 1
-    post_ids = []
+    next_pages = {feed.name: 1 for feed in crawled_feeds()}
+    feed_post_ids = {feed: set() for feed in next_pages}
+    sentiment_scheduler = SentimentScheduler()
     persist_results = []
-    next_page_exists = True
-    while next_page_exists:
+    while next_pages:
         pages_result = (
-            group(scrap_page.s(page) for page in range(page_index, page_end))
+            group(
+                scrap_page.s(feed, page)
+                for feed, page_index in next_pages.items()
+                for page in range(
+                    page_index,
+                    min(
+                        page_index + settings.MAX_PAGE_TO_SCRAP_IN_PARALEL,
+                        settings.MAX_PAGE_TO_SCRAP_PER_FEED + 1,
+                    ),
+                )
+            )
         ).delay()
 
         try:
@@ -120,83 +285,99 @@ def scrap_from_web() -> None:
             with allow_join_result():
                 pages_result_list = pages_result.get()
 
-            for page_post_ids, persist_result in pages_result_list:
-                if page_post_ids == []:
-                    next_page_exists = False
+            round_posts = []
+            for feed, page_posts, persist_result in pages_result_list:
+                if not {post["id"] for post in page_posts} - feed_post_ids[feed]:
+                    next_pages.pop(feed, None)
 
-                post_ids += page_post_ids
+                round_posts += page_posts
+                feed_post_ids[feed].update(post["id"] for post in page_posts)
                 if persist_result:
                     persist_results.append(persist_result)
 
-            if not next_page_exists:
-                is_all_posts_processed = False
-                max_retries = 10
-                wait_time = 1
-                while not is_all_posts_processed:
-                    if max_retries >= wait_time:
-                        is_all_posts_processed = all(r.ready() for r in persist_results)
-                        logger.info(
-                            f"Waiting all persist tasks to finish for {wait_time} seconds."
-                        )
-                        time.sleep(wait_time)
-                        wait_time += 1
-                    else:
-                        ScrapperTracker.fail()
-                        raise Exception(
-                            "Maximum retry exceeded while waiting all persist tasks to finish."
-                            "Backing off."
-                        )
-
-                logger.info(f"Number of posts processed: {len(post_ids)}")
-                Post.objects.exclude(id__in=list(post_ids)).delete()
-                ScrapperTracker.finish()
-            else:
-                page_index, page_end = (
-                    page_end,
-                    page_end + settings.MAX_PAGE_TO_SCRAP_IN_PARALEL,
-                )
-        except (
-            requests.exceptions.HTTPError,
-            requests.exceptions.ConnectionError,
-            requests.exceptions.Timeout,
-        ) as err:
+            enqueue_sentiment(sentiment_scheduler.select(round_posts))
+
+            for feed in list(next_pages):
+                next_pages[feed] += settings.MAX_PAGE_TO_SCRAP_IN_PARALEL
+                if next_pages[feed] > settings.MAX_PAGE_TO_SCRAP_PER_FEED:
+                    next_pages.pop(feed)
+        except Exception as err:
+            # Any failure of a page, e.g. a request error or a page failed to be parsed,
+            # fails the crawl so UI isn't blocked by a crawl that won't finish
             ScrapperTracker.fail()
             raise err
 
+    is_all_posts_processed = False
+    max_retries = 10
+    wait_time = 1
+    while not is_all_posts_processed:
+        if max_retries >= wait_time:
+            is_all_posts_processed = all(r.ready() for r in persist_results)
+            logger.info(f"Waiting all persist tasks to finish for {wait_time} seconds.")
+            time.sleep(wait_time)
+            wait_time += 1
+        else:
+            ScrapperTracker.fail()
+            raise Exception(
+                "Maximum retry exceeded while waiting all persist tasks to finish."
+                "Backing off."
+            )
+
+    try:
+        # Write whatever is still buffered, so UI reads complete data once released
+        PostUpdateBuffer().flush()
+        logger.info(
+            f"Number of posts processed: {len(set().union(*feed_post_ids.values()))}"
+        )
+        prune_posts(feed_post_ids)
+    except DatabaseError as err:
+        # Updates failed to be written are restored to the buffer for the next flush
+        ScrapperTracker.fail()
+        raise err
+    ScrapperTracker.finish()
+
 
 @app.task(queue="scrap_page_queue")
-def scrap_page(page_number: int) -> Tuple[List[int], GroupResult]:
-    """Makes a request to Hackernews webpage to get the content of the page with given number.
-    Parse list of posts on the page content. Fires asynchronous group of tasks to persist
-    and fetch sentiment for each post.
+def scrap_page(feed: str, page_number: int) -> Tuple[str, List[Dict], GroupResult]:
+    """Makes a request to Hackernews webpage to get the content of the page with given number
+    of the given feed. Parse list of posts on the page content. Fires asynchronous group of
+    tasks to persist each post. Returns parsed posts so orchestrator fetches sentiment once
+    for posts listed in several feeds.
     """
-    logger.info(f"Scrapping page {page_number}")
-    r = requests.get(f"{settings.HACKERNEWS_URL}news?p={page_number}")
+    import requests
+
+    from hackernews_clone.posts.scrapper import scrap_posts
+
+    logger.info(f"Scrapping {feed} page {page_number}")
+    r = requests.get(f"{settings.HACKERNEWS_URL}{FEEDS[feed].path}?p={page_number}")
     r.raise_for_status()
 
-    post_ids = []
+    posts = []
     persist_tasks = []
-    sentiment_tasks = []
     for post in scrap_posts(r.content):
-        post_ids.append(post["id"])
+        post["feeds"] = {feed: post["rank"]}
+        post["rank"] = post["rank"] if feed == PRIMARY_FEED else None
+        posts.append(post)
         persist_tasks.append(persist.s(post))
-        sentiment_tasks.append(fetch_sentiment.s(post))
 
     persist_result = group(persist_tasks).delay() if persist_tasks else None
 
-    if sentiment_tasks:
-        group(sentiment_tasks).delay()
-
-    return post_ids, persist_result
+    return feed, posts, persist_result
 
 
 @app.task(queue="api_post_queue")
-def fetch_post_from_api(post_id: int, rank: int) -> AsyncResult:
+def fetch_post_from_api(
+    post_id: int, feeds: Dict[str, int], score_sentiment: bool = True
+) -> AsyncResult:
     """Makes a request to Hackernews API to get post information. Fires tasks to persist it
-    in db, and fetch sentiment for it. This don't traverse all kids to find num of comment. It's
-    so heavy operation. However, if we really need to; we can do it by firing async tasks to
-    traverse all kids and count number of kids using cache with lock.
+    in db with its ranks in given feeds, and fetch sentiment for it if it's selected to be
+    scored by the orchestrator. This don't traverse all
+    kids to find num of comment. It's so heavy operation. However, if we really need to; we
+    can do it by firing async tasks to traverse all kids and count number of kids using cache
+    with lock.
     """
+    import requests
+
     r = requests.get(f"{settings.HACKERNEWS_API_URL}item/{post_id}.json")
     r.raise_for_status()
 
@@ -206,31 +387,46 @@ def fetch_post_from_api(post_id: int, rank: int) -> AsyncResult:
         "id": post_id,
         "url": url,
         "subject": post_res.get("title"),
-        "rank": rank,
-        "age": timeago.format(
-            datetime.fromtimestamp(post_res.get("time")), datetime.now()
-        ),
+        "rank": feeds.get(PRIMARY_FEED),
+        "feeds": feeds,
+        "submitted_at": datetime.fromtimestamp(
+            post_res.get("time"), tz=timezone.utc
+        ).isoformat(),
+        "domain": get_domain(url),
         "score": post_res.get("score"),
         "submitted_by": post_res.get("by"),
         "num_of_comments": len(post_res.get("kids", [])),
     }
 
-    persist_result = persist.delay(post)
-    fetch_sentiment.delay(post)
+    persist_result = persist.delay(post, API)
+    if score_sentiment:
+        enqueue_sentiment([post])
     return persist_result
 
 
 @app.task(queue="main_queue", ignore_results=True)
 def fetch_from_api() -> None:
-    """Makes a request to Hackernews API to get list of post ids of at most 500 top posts.
-    Fires group of tasks to fetch information for each post. Collect all persist task
-    AsyncResult returned by fetch_post_from_api group of tasks ind wait until all is
-    done executing to mark APIFetcherTracker finished.
+    """Makes a request to Hackernews API to get list of post ids of each crawled feed, at most
+    500 posts per feed. Post ids listed in several feeds are merged, so each post is fetched
+    once with its ranks in all feeds. Fires group of tasks to fetch information for each post.
+    Posts to fetch sentiment for are selected by SentimentScheduler upfront, since ranks
+    are known before fetching posts. Collect all persist task AsyncResult returned by
+    fetch_post_from_api group of tasks ind wait until all is done executing to mark
+    APIFetcherTracker finished.
     """
+    import requests
+
     APIFetcherTracker.activate()
     logger.info("Fetching from api")
+    feed_post_ids = {}
+    post_feeds = defaultdict(dict)
     try:
-        post_ids = requests.get(f"{settings.HACKERNEWS_API_URL}topstories.json").json()
+        for feed in crawled_feeds():
+            feed_post_ids[feed.name] = requests.get(
+                f"{settings.HACKERNEWS_API_URL}{feed.api_endpoint}.json"
+            ).json()
+            for rank, post_id in enumerate(feed_post_ids[feed.name], 1):
+                post_feeds[post_id][feed.name] = rank
     except (
         requests.exceptions.HTTPError,
         requests.exceptions.ConnectionError,
@@ -239,8 +435,10 @@ def fetch_from_api() -> None:
         APIFetcherTracker.fail()
         raise err
 
+    sentiment_post_ids = select_sentiment_post_ids(post_feeds)
     group_result = group(
-        fetch_post_from_api.s(post_id, rank) for rank, post_id in enumerate(post_ids, 1)
+        fetch_post_from_api.s(post_id, feeds, post_id in sentiment_post_ids)
+        for post_id, feeds in post_feeds.items()
     ).delay()
 
     max_retries = 10
@@ -260,6 +458,94 @@ def fetch_from_api() -> None:
                     "Backing off."
                 )
 
-    logger.info(f"Number of posts processed: {len(post_ids)}")
+    try:
+        PostUpdateBuffer().flush()
+        logger.info(f"Number of posts processed: {len(post_feeds)}")
+        prune_posts({feed: set(ids) for feed, ids in feed_post_ids.items()})
+    except DatabaseError as err:
+        APIFetcherTracker.fail()
+        raise err
     APIFetcherTracker.finish()
-    Post.objects.exclude(id__in=post_ids).delete()
+
+
+@app.task(queue="main_queue", ignore_result=True)
+def sync_from_updates() -> None:
+    """Keeps posts fresh between full crawls using Hackernews API updates stream.
+    Makes a request to get max item id, recently changed item ids, and post ids of crawled
+    feeds. Fires fetch_post_from_api tasks only for listed posts which are new (not in db or
+    with an id larger than max item of the previous sync) or changed; ranks of other listed
+    posts are buffered directly without fetching them. fetch_from_api remains as the full
+    reconciliation pass.
+    """
+    import requests
+
+    # Skip if previous sync is still running, or a full crawl is active
+    if not cache.add(UPDATE_SYNC_LOCK_KEY, 1, timeout=UPDATE_SYNC_LOCK_TIMEOUT):
+        return
+    try:
+        if (
+            ScrapperTracker.objects.get(pk=1).status == ScrapperTracker.ACTIVE
+            or APIFetcherTracker.objects.get(pk=1).status == APIFetcherTracker.ACTIVE
+        ):
+            return
+
+        UpdateSyncTracker.activate()
+        last_max_item = UpdateSyncTracker.objects.get(pk=1).max_item
+        try:
+            max_item = requests.get(f"{settings.HACKERNEWS_API_URL}maxitem.json").json()
+            changed_ids = set(
+                requests.get(f"{settings.HACKERNEWS_API_URL}updates.json").json()["items"]
+            )
+            feed_post_ids = {}
+            post_feeds = defaultdict(dict)
+            for feed in crawled_feeds():
+                feed_post_ids[feed.name] = requests.get(
+                    f"{settings.HACKERNEWS_API_URL}{feed.api_endpoint}.json"
+                ).json()
+                for rank, post_id in enumerate(feed_post_ids[feed.name], 1):
+                    post_feeds[post_id][feed.name] = rank
+        except (
+            requests.exceptions.HTTPError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as err:
+            UpdateSyncTracker.fail()
+            raise err
+
+        known_feeds = defaultdict(dict)
+        for post_id, feed, rank in FeedRank.objects.filter(
+            post_id__in=list(post_feeds)
+        ).values_list("post_id", "feed", "rank"):
+            known_feeds[post_id][feed] = rank
+
+        fetch_post_feeds = {}
+        for post_id, feeds in post_feeds.items():
+            is_new = post_id not in known_feeds or (
+                last_max_item is not None and post_id > last_max_item
+            )
+            if is_new or post_id in changed_ids:
+                fetch_post_feeds[post_id] = feeds
+            elif feeds != known_feeds[post_id]:
+                fields = {}
+                if PRIMARY_FEED in feed_post_ids:
+                    fields["rank"] = feeds.get(PRIMARY_FEED)
+                buffer_post_update(
+                    post_id, ":".join([API, *sorted(feeds)]), fields, feeds=feeds
+                )
+
+        if fetch_post_feeds:
+            sentiment_post_ids = select_sentiment_post_ids(fetch_post_feeds)
+            group(
+                fetch_post_from_api.s(post_id, feeds, post_id in sentiment_post_ids)
+                for post_id, feeds in fetch_post_feeds.items()
+            ).delay()
+        logger.info(
+            f"Synced {len(post_feeds)} posts, "
+            f"fetching {len(fetch_post_feeds)} new or changed"
+        )
+
+        prune_posts({feed: set(ids) for feed, ids in feed_post_ids.items()})
+        UpdateSyncTracker.objects.filter(pk=1).update(max_item=max_item)
+        UpdateSyncTracker.finish()
+    finally:
+        cache.delete(UPDATE_SYNC_LOCK_KEY)
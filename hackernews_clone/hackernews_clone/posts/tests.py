@@ -1,3 +1,612 @@
-from django.test import TestCase
+import csv
+import json
+import threading
+import time
 
-# Create your tests here.
+from unittest import mock, skipUnless
+
+import requests
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from hackernews_clone.db import REPLICA, ReplicaRouter, _replica_reads
+from hackernews_clone.posts.buffer import PostUpdateBuffer, merge_updates, upsert_posts
+from hackernews_clone.posts.models import (
+    Post,
+    PostAggregate,
+    ScrapperTracker,
+    UpdateSyncTracker,
+)
+from hackernews_clone.posts.scheduling import (
+    INFLIGHT_KEY,
+    SentimentScheduler,
+    claim_inflight,
+    rate_limited_countdown,
+    release_inflight,
+    sentiment_retry_countdown,
+)
+from hackernews_clone.posts.scrapper import scrap_posts
+from hackernews_clone.posts.tasks import (
+    UPDATE_SYNC_LOCK_KEY,
+    fetch_sentiment,
+    sync_from_updates,
+)
+from hackernews_clone.posts.views import PostList
+
+
+def list_posts(query):
+    """Returns queryset PostList lists for given query string."""
+    view = PostList()
+    view.request = Request(APIRequestFactory().get(f"/posts/?{query}"))
+    view.format_kwarg = None
+    return view.filter_queryset(view.get_queryset())
+
+
+class PostListIndexTestCase(TestCase):
+    """Checks sorting and filtering of PostList are planned using the index backing it."""
+
+    def assertUsesIndex(self, query, index_name):
+        if connection.vendor == "postgresql":
+            # Planner prefers sequential scan on a table this small
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        # PostList reads a page at a time, planner uses sorting indexes to find it
+        page = list_posts(query)[:settings.REST_FRAMEWORK["PAGE_SIZE"]]
+        self.assertIn(index_name, page.explain())
+
+    def test_sort_by_score(self):
+        self.assertUsesIndex("ordering=-score", "post_score_idx")
+
+    def test_sort_by_time(self):
+        self.assertUsesIndex("ordering=-submitted_at", "post_submitted_at_idx")
+
+    def test_sort_by_comments(self):
+        self.assertUsesIndex("ordering=-num_of_comments", "post_comments_idx")
+
+    def test_sort_by_sentiment(self):
+        self.assertUsesIndex("ordering=-sentiment_score", "post_sentiment_idx")
+
+    def test_filter_by_user(self):
+        self.assertUsesIndex(
+            "submitted_by=pg&ordering=-submitted_at", "post_user_time_idx"
+        )
+
+    def test_filter_by_domain(self):
+        self.assertUsesIndex(
+            "domain=github.com&ordering=-submitted_at", "post_domain_time_idx"
+        )
+
+    def test_filter_by_sentiment_range(self):
+        self.assertUsesIndex(
+            "sentiment_min=0.2&sentiment_max=0.8&ordering=-sentiment_score",
+            "post_sentiment_idx",
+        )
+
+
+class PostListFeedTestCase(TestCase):
+    def setUp(self):
+        Post.objects.create(id=1, **post_fields(rank=2))
+        Post.objects.create(id=2, **post_fields(rank=None)).feed_ranks.create(
+            feed="ask", rank=1
+        )
+        Post.objects.create(id=3, **post_fields(rank=1)).feed_ranks.create(
+            feed="ask", rank=2
+        )
+
+    def test_list_primary_feed_by_default(self):
+        self.assertEqual(list(list_posts("").values_list("id", flat=True)), [3, 1])
+
+    def test_list_given_feed(self):
+        self.assertEqual(list(list_posts("feed=ask").values_list("id", flat=True)), [2, 3])
+
+
+POST_ROW = (
+    '<tr class="athing" id="{id}"><td><span class="rank">{rank}.</span></td>'
+    '<td><a href="https://github.com/" class="storylink">Subject</a></td></tr>'
+    '<tr><td class="subtext"><span class="score">10 points</span> by '
+    '<a href="user?id=pg">pg</a> <span class="age" title="2020-10-01T10:00:00">'
+    '<a href="item?id={id}">1 hour ago</a></span> | <a href="hide">hide</a> | '
+    '<a href="item?id={id}">2\xa0comments</a></td></tr>'
+)
+
+
+class ScrapPostsTestCase(TestCase):
+    def test_scrap_posts(self):
+        posts = scrap_posts(f"<table>{POST_ROW.format(id=1, rank=1)}</table>")
+
+        self.assertEqual(posts, [{"id": 1, **post_fields()}])
+
+    def test_rows_failed_to_be_parsed_are_skipped(self):
+        broken_row = POST_ROW.format(id=2, rank=2).replace(' class="age"', "")
+        posts = scrap_posts(f"<table>{broken_row}{POST_ROW.format(id=1, rank=1)}</table>")
+
+        self.assertEqual([post["id"] for post in posts], [1])
+
+
+def post_fields(**fields):
+    return {
+        "url": "https://github.com/",
+        "subject": "Subject",
+        "submitted_by": "pg",
+        "rank": 1,
+        "score": 10,
+        "submitted_at": "2020-10-01T10:00:00+00:00",
+        "domain": "github.com",
+        "num_of_comments": 2,
+        **fields,
+    }
+
+
+def update(fields=None, insert_only=None, feeds=None):
+    return {"fields": fields or {}, "insert_only": insert_only or {}, "feeds": feeds or {}}
+
+
+class PostUpdateBufferTestCase(TestCase):
+    def test_merge_updates_by_source_precedence(self):
+        merged = merge_updates(
+            {
+                "api:news": update({"score": 3, "rank": 2}, feeds={"news": 2}),
+                "sentiment": update({"sentiment_score": 0.5}, {"subject": "Old"}),
+                "scrapper:ask:news": update(
+                    {"score": 1, "num_of_comments": 4}, {"subject": "New"}, {"ask": 5}
+                ),
+            }
+        )
+        self.assertEqual(
+            merged,
+            update(
+                {"sentiment_score": 0.5, "score": 3, "num_of_comments": 4, "rank": 2},
+                {"subject": "New"},
+                {"ask": 5, "news": 2},
+            ),
+        )
+
+    def test_insert_only_fields_create_missing_post(self):
+        upsert_posts({1: update({"sentiment_score": 0.5}, post_fields(subject="Old"))})
+
+        post = Post.objects.get(id=1)
+        self.assertEqual((post.subject, post.sentiment_score), ("Old", 0.5))
+        self.assertEqual(post.sentiment_label, "Not Ready")
+
+    def test_sentiment_update_keeps_post_fields(self):
+        Post.objects.create(id=1, **post_fields(subject="New", score=20))
+
+        upsert_posts(
+            {1: update({"sentiment_score": 0.5}, post_fields(subject="Old", score=10))}
+        )
+
+        post = Post.objects.get(id=1)
+        self.assertEqual((post.subject, post.score), ("New", 20))
+        self.assertEqual(post.sentiment_score, 0.5)
+
+    def test_update_without_fields_only_inserts_missing_post(self):
+        Post.objects.create(id=1, **post_fields(subject="New"))
+
+        upsert_posts(
+            {
+                1: update(insert_only=post_fields(subject="Old"), feeds={"ask": 3}),
+                2: update(insert_only=post_fields(subject="Other"), feeds={"ask": 4}),
+            }
+        )
+
+        self.assertEqual(Post.objects.get(id=1).subject, "New")
+        self.assertEqual(Post.objects.get(id=2).subject, "Other")
+        self.assertEqual(
+            list(Post.objects.values_list("feed_ranks__rank", flat=True)), [3, 4]
+        )
+
+    def test_flush_drops_only_invalid_updates(self):
+        buffer = PostUpdateBuffer(redis=mock.MagicMock())
+        drained = {
+            1: {"api:news": update(post_fields(subject=None))},
+            2: {"api:news": update(post_fields(rank=2))},
+        }
+        with mock.patch.object(buffer, "drain", return_value=drained):
+            self.assertEqual(buffer.flush(), 1)
+
+        self.assertEqual(list(Post.objects.values_list("id", flat=True)), [2])
+
+    def test_flush_restores_updates_on_db_error(self):
+        buffer = PostUpdateBuffer(redis=mock.MagicMock())
+        drained = {1: {"api:news": update(post_fields())}}
+        with mock.patch.object(buffer, "drain", return_value=drained), mock.patch(
+            "hackernews_clone.posts.buffer.upsert_posts", side_effect=OperationalError
+        ), mock.patch.object(buffer, "restore") as restore:
+            with self.assertRaises(OperationalError):
+                buffer.flush()
+
+        restore.assert_called_once_with(drained)
+
+
+@override_settings(SENTIMENT_MAX_RANK=300)
+class SentimentSchedulerTestCase(TestCase):
+    def test_select_best_ranked_posts_within_budget(self):
+        Post.objects.create(id=1, sentiment_score=0.5, **post_fields())
+        scheduler = SentimentScheduler(budget=2)
+        posts = [
+            {"id": 1, "feeds": {"news": 1}},
+            {"id": 2, "feeds": {"news": 40}},
+            {"id": 3, "feeds": {"news": 2}},
+            {"id": 2, "feeds": {"ask": 3}},
+            {"id": 4, "feeds": {"news": 4}},
+        ]
+
+        selected = scheduler.select(posts)
+
+        self.assertEqual([post["id"] for post in selected], [3, 2])
+        self.assertEqual(selected[1]["feeds"], {"news": 40, "ask": 3})
+        self.assertEqual(scheduler.select([{"id": 5, "feeds": {"news": 5}}]), [])
+
+    def test_select_skips_posts_ranked_past_max_rank(self):
+        selected = SentimentScheduler(budget=500).select(
+            {"id": rank, "feeds": {"news": rank}} for rank in range(1, 501)
+        )
+
+        self.assertEqual(len(selected), 300)
+        self.assertEqual(selected[-1]["id"], 300)
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs row and table locks of postgresql")
+class ConcurrentPostAggregateTestCase(TransactionTestCase):
+    def run_in_thread(self, target):
+        errors = []
+
+        def run():
+            try:
+                target()
+            except Exception as err:
+                errors.append(err)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, errors
+
+    def test_fold_creating_aggregate_while_refreshing(self):
+        Post.objects.create(id=2, **post_fields(rank=2, domain="old.com"))
+        PostAggregate.refresh()
+        # Post from a new domain, in a rank bucket having an aggregate
+        Post.objects.create(id=1, **post_fields(rank=1, domain="new.com"))
+        folded, commit_fold = threading.Event(), threading.Event()
+
+        def fold():
+            with transaction.atomic():
+                upsert_posts({1: update({"sentiment_score": 0.5})})
+                folded.set()
+                commit_fold.wait(10)
+
+        fold_thread, fold_errors = self.run_in_thread(fold)
+        folded.wait(10)
+        refresh_thread, refresh_errors = self.run_in_thread(PostAggregate.refresh)
+        # Let refresh reach the aggregates it waits for before fold commits
+        time.sleep(0.5)
+        commit_fold.set()
+        fold_thread.join(10)
+        refresh_thread.join(10)
+
+        self.assertEqual((fold_errors, refresh_errors), ([], []))
+        aggregates = {
+            (aggregate.dimension, aggregate.key): (
+                aggregate.post_count, aggregate.sentiment_count, aggregate.sentiment_sum
+            )
+            for aggregate in PostAggregate.objects.all()
+        }
+        self.assertEqual(aggregates[PostAggregate.DOMAIN, "new.com"], (1, 1, 0.5))
+        self.assertEqual(aggregates[PostAggregate.RANK_BUCKET, "1"], (2, 1, 0.5))
+
+    def test_fold_waits_for_refresh(self):
+        Post.objects.create(id=1, **post_fields(rank=1, domain="new.com"))
+        refreshing, commit_refresh = threading.Event(), threading.Event()
+        refresh = PostAggregate.refresh
+
+        def refresh_and_wait():
+            with transaction.atomic():
+                refresh()
+                refreshing.set()
+                commit_refresh.wait(10)
+
+        refresh_thread, refresh_errors = self.run_in_thread(refresh_and_wait)
+        refreshing.wait(10)
+        fold_thread, fold_errors = self.run_in_thread(
+            lambda: upsert_posts({1: update({"sentiment_score": 0.5})})
+        )
+        time.sleep(0.5)
+        commit_refresh.set()
+        refresh_thread.join(10)
+        fold_thread.join(10)
+
+        self.assertEqual((fold_errors, refresh_errors), ([], []))
+        aggregate = PostAggregate.objects.get(dimension=PostAggregate.DOMAIN, key="new.com")
+        self.assertEqual((aggregate.post_count, aggregate.sentiment_count), (1, 1))
+
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SENTIMENT_BACKPRESSURE_DELAY=10)
+class SentimentRetryTestCase(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_claim_inflight_once(self):
+        self.assertTrue(claim_inflight(1))
+        self.assertFalse(claim_inflight(1))
+        release_inflight(1)
+        self.assertTrue(claim_inflight(1))
+
+    def test_rate_limited_waits_for_retry_after(self):
+        countdown = sentiment_retry_countdown(429, {"Retry-After": "30"}, 0)
+
+        self.assertTrue(30 <= countdown <= 40)
+        self.assertEqual(rate_limited_countdown(), 30)
+
+    def test_server_and_connection_errors_back_off(self):
+        self.assertEqual(sentiment_retry_countdown(503, {}, 0), 1)
+        self.assertTrue(9 <= sentiment_retry_countdown(None, {}, 2) <= 16)
+        self.assertIsNone(rate_limited_countdown())
+
+    def test_client_errors_are_not_retried(self):
+        self.assertIsNone(sentiment_retry_countdown(400, {}, 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SENTIMENT_BACKPRESSURE_DELAY=10)
+class FetchSentimentTestCase(TestCase):
+    post = {"id": 1, "feeds": {"news": 40}, **post_fields()}
+
+    def setUp(self):
+        claim_inflight(self.post["id"])
+
+    def tearDown(self):
+        cache.clear()
+
+    @mock.patch("hackernews_clone.posts.tasks.buffer_post_update")
+    @mock.patch("hackernews_clone.posts.sentiment.get_sentiment")
+    def test_deferred_while_rate_limited(self, get_sentiment, buffer_post_update):
+        sentiment_retry_countdown(429, {"Retry-After": "30"}, 0)
+
+        with mock.patch.object(fetch_sentiment, "apply_async") as apply_async:
+            fetch_sentiment(self.post)
+
+        get_sentiment.assert_not_called()
+        buffer_post_update.assert_not_called()
+        self.assertTrue(30 <= apply_async.call_args.kwargs["countdown"] <= 40)
+        self.assertTrue(cache.get(INFLIGHT_KEY.format(self.post["id"])))
+
+    @mock.patch("hackernews_clone.posts.tasks.buffer_post_update")
+    @mock.patch(
+        "hackernews_clone.posts.sentiment.get_sentiment",
+        side_effect=requests.exceptions.ConnectionError("Connection refused"),
+    )
+    def test_connection_error_is_retried(self, get_sentiment, buffer_post_update):
+        with mock.patch.object(
+            fetch_sentiment, "retry", side_effect=Exception("retry")
+        ) as retry:
+            with self.assertRaisesMessage(Exception, "retry"):
+                fetch_sentiment(self.post)
+
+        self.assertEqual(retry.call_args.kwargs["countdown"], 1)
+        buffer_post_update.assert_not_called()
+        self.assertTrue(cache.get(INFLIGHT_KEY.format(self.post["id"])))
+
+    @mock.patch("hackernews_clone.posts.tasks.buffer_post_update")
+    @mock.patch(
+        "hackernews_clone.posts.sentiment.get_sentiment",
+        side_effect=requests.exceptions.Timeout("Timed out"),
+    )
+    def test_given_up_connection_error_releases_post(
+        self, get_sentiment, buffer_post_update
+    ):
+        with mock.patch.object(fetch_sentiment, "max_retries", 0):
+            fetch_sentiment(self.post)
+
+        fields = buffer_post_update.call_args.args[2]
+        self.assertEqual(fields, {"sentiment_score": None, "sentiment_label": "Timed out"})
+        self.assertIsNone(cache.get(INFLIGHT_KEY.format(self.post["id"])))
+
+
+class PostAggregateTestCase(TestCase):
+    def aggregate(self, dimension, key):
+        return PostAggregate.objects.values(
+            "post_count", "score_sum", "sentiment_sum", "sentiment_count"
+        ).get(dimension=dimension, key=key)
+
+    def test_refresh(self):
+        Post.objects.create(id=1, sentiment_score=0.5, **post_fields(rank=30))
+        Post.objects.create(id=2, **post_fields(rank=31, score=5))
+        PostAggregate.objects.create(dimension=PostAggregate.DOMAIN, key="stale.com")
+
+        PostAggregate.refresh()
+
+        self.assertEqual(
+            self.aggregate(PostAggregate.DOMAIN, "github.com"),
+            {"post_count": 2, "score_sum": 15, "sentiment_sum": 0.5, "sentiment_count": 1},
+        )
+        self.assertEqual(
+            set(
+                PostAggregate.objects.filter(
+                    dimension=PostAggregate.RANK_BUCKET
+                ).values_list("key", flat=True)
+            ),
+            {"1", "2"},
+        )
+        self.assertFalse(PostAggregate.objects.filter(key="stale.com").exists())
+
+    def test_fold_sentiment_into_refreshed_aggregates(self):
+        post = Post.objects.create(id=1, **post_fields(rank=31))
+        PostAggregate.refresh()
+
+        upsert_posts({1: update({"sentiment_score": 0.5})})
+        upsert_posts({1: update({"sentiment_score": 0.25})})
+
+        # Rank bucket keys of refresh and fold match, so fold updates refreshed aggregate
+        self.assertEqual(
+            PostAggregate.objects.filter(dimension=PostAggregate.RANK_BUCKET).count(), 1
+        )
+        expected = {
+            "post_count": 1, "score_sum": 10, "sentiment_sum": 0.25, "sentiment_count": 1
+        }
+        for dimension, key in PostAggregate.post_keys(post.__dict__).items():
+            self.assertEqual(self.aggregate(dimension, key), expected)
+
+    def test_fold_sentiment_creates_missing_aggregates(self):
+        Post.objects.create(id=1, **post_fields(domain="new.com", rank=None))
+
+        upsert_posts({1: update({"sentiment_score": 0.5})})
+
+        self.assertEqual(
+            self.aggregate(PostAggregate.DOMAIN, "new.com"),
+            {"post_count": 0, "score_sum": 0, "sentiment_sum": 0.5, "sentiment_count": 1},
+        )
+        self.assertFalse(
+            PostAggregate.objects.filter(dimension=PostAggregate.RANK_BUCKET).exists()
+        )
+
+
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self):
+        token = _replica_reads.set(True)
+        self.addCleanup(_replica_reads.reset, token)
+
+    def test_replica_reads_only_posts_models(self):
+        with mock.patch.dict(settings.DATABASES, {REPLICA: {}}):
+            self.assertEqual(ReplicaRouter().db_for_read(Post), REPLICA)
+            self.assertEqual(ReplicaRouter().db_for_read(User), "default")
+
+    def test_replica_reads_need_replica(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Post), "default")
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    CRAWL_FEEDS=["news", "ask"],
+    HACKERNEWS_API_URL="https://api/",
+)
+class SyncFromUpdatesTestCase(TestCase):
+    fixtures = ["initial_data"]
+
+    responses = {
+        "https://api/maxitem.json": 105,
+        "https://api/updates.json": {"items": [3], "profiles": []},
+        "https://api/topstories.json": [1, 2, 3, 101, 4],
+        "https://api/askstories.json": [2],
+    }
+
+    def setUp(self):
+        # Post 1 is unchanged, 2 changed its ranks only, 3 is updated, 101 is newer than
+        # last synced max item, 4 isn't known
+        for post_id, rank in [(1, 1), (2, 1), (3, 3), (101, 4)]:
+            Post.objects.create(id=post_id, **post_fields(rank=rank)).feed_ranks.create(
+                feed="news", rank=rank
+            )
+        UpdateSyncTracker.objects.filter(pk=1).update(max_item=100)
+
+        patches = {
+            "get": mock.patch(
+                "requests.get",
+                side_effect=lambda url: mock.Mock(json=lambda: self.responses[url]),
+            ),
+            "group": mock.patch("hackernews_clone.posts.tasks.group"),
+            "buffer_post_update": mock.patch(
+                "hackernews_clone.posts.tasks.buffer_post_update"
+            ),
+        }
+        for name, patch in patches.items():
+            setattr(self, name, patch.start())
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        cache.clear()
+
+    def fetched_posts(self):
+        return {
+            signature.args[0]: signature.args[1]
+            for signature in self.group.call_args.args[0]
+        }
+
+    def test_fetch_new_and_updated_posts(self):
+        sync_from_updates()
+
+        self.assertEqual(
+            self.fetched_posts(), {3: {"news": 3}, 101: {"news": 4}, 4: {"news": 5}}
+        )
+        tracker = UpdateSyncTracker.objects.get(pk=1)
+        self.assertEqual((tracker.max_item, tracker.status), (105, UpdateSyncTracker.IDLE))
+
+    def test_buffer_rank_changes_without_fetching(self):
+        sync_from_updates()
+
+        self.buffer_post_update.assert_called_once_with(
+            2, "api:ask:news", {"rank": 2}, feeds={"news": 2, "ask": 1}
+        )
+
+    def test_skip_while_previous_sync_is_running(self):
+        cache.add(UPDATE_SYNC_LOCK_KEY, 1)
+
+        sync_from_updates()
+
+        self.get.assert_not_called()
+
+    def test_skip_while_crawl_is_active(self):
+        ScrapperTracker.objects.filter(pk=1).update(status=ScrapperTracker.ACTIVE)
+
+        sync_from_updates()
+
+        self.get.assert_not_called()
+        self.assertEqual(UpdateSyncTracker.objects.get(pk=1).max_item, 100)
+        self.assertIsNone(cache.get(UPDATE_SYNC_LOCK_KEY))
+
+
+class PostExportTestCase(TestCase):
+    fixtures = ["initial_data"]
+
+    def setUp(self):
+        Post.objects.create(id=1, **post_fields(rank=2, score=5, submitted_by="dang"))
+        Post.objects.create(id=2, **post_fields(rank=1, score=20))
+        Post.objects.create(id=3, **post_fields(rank=3, score=10))
+
+    def export(self, query):
+        response = self.client.get(f"/posts/export/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        posts = [json.loads(line) for line in self.export("").splitlines()]
+
+        self.assertEqual([post["id"] for post in posts], [2, 1, 3])
+        self.assertEqual(
+            posts[0],
+            {
+                "id": 2,
+                "sentiment_score": None,
+                "sentiment_label": "Not Ready",
+                **post_fields(rank=1, score=20, submitted_at="2020-10-01T10:00:00Z"),
+            },
+        )
+
+    def test_export_csv(self):
+        rows = list(csv.DictReader(self.export("export_format=csv").splitlines()))
+
+        self.assertEqual([row["id"] for row in rows], ["2", "1", "3"])
+        self.assertEqual(rows[0]["submitted_at"], "2020-10-01T10:00:00Z")
+        self.assertEqual(rows[0]["sentiment_score"], "")
+
+    def test_export_with_post_list_filters_and_ordering(self):
+        posts = [
+            json.loads(line)
+            for line in self.export("submitted_by=pg&ordering=-score").splitlines()
+        ]
+
+        self.assertEqual([post["id"] for post in posts], [2, 3])
+
+    def test_unknown_export_format(self):
+        response = self.client.get("/posts/export/?export_format=xml")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("export_format", response.json())
@@ -1,18 +1,54 @@
+import csv
+import json
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.http import StreamingHttpResponse
 from rest_framework import filters, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import ListAPIView
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-from hackernews_clone.posts.models import Post, ScrapperTracker, APIFetcherTracker
-from hackernews_clone.posts.serializers import PostSerializer
+from hackernews_clone.posts.feeds import FEEDS
+from hackernews_clone.posts.filters import PostFilter
+from hackernews_clone.posts.models import (
+    Post,
+    PostAggregate,
+    ScrapperTracker,
+    APIFetcherTracker,
+    UpdateSyncTracker,
+)
+from hackernews_clone.posts.serializers import PostAggregateSerializer, PostSerializer
 from hackernews_clone.posts.tasks import scrap_from_web, fetch_from_api
 
 
 class PostList(ListAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [filters.SearchFilter, PostFilter, filters.OrderingFilter]
     search_fields = ["@subject"]
+    # Each ordering field is backed by an index, see Post.Meta.indexes
+    ordering_fields = [
+        "rank",
+        "score",
+        "submitted_at",
+        "num_of_comments",
+        "sentiment_score",
+    ]
+
+    def get_queryset(self):
+        """Lists posts of the feed given by `feed` query parameter in its rank order if given,
+        otherwise lists posts of PRIMARY_FEED, whose rank is kept in Post.rank, in its rank
+        order.
+        """
+        feed = self.request.query_params.get("feed")
+        if feed in FEEDS:
+            return Post.objects.filter(feed_ranks__feed=feed).order_by("feed_ranks__rank")
+        return super().get_queryset().filter(rank__isnull=False)
 
     def get(self, request, *args, **kwargs):
         if ScrapperTracker.objects.get(pk=1).status == ScrapperTracker.ACTIVE:
@@ -21,6 +57,84 @@ class PostList(ListAPIView):
             return self.list(request, *args, **kwargs)
 
 
+class Echo:
+    """File-like object returning what's written to it, so csv.writer output can be
+    streamed.
+    """
+
+    def write(self, value):
+        return value
+
+
+class PostExport(PostList):
+    """Streams all posts matching PostList filters in a single response, as NDJSON or CSV
+    given by `export_format` query parameter. Rows are read with a server-side cursor in
+    chunks of EXPORT_CHUNK_SIZE, so memory use doesn't depend on number of posts.
+    """
+    fields = [field.attname for field in Post._meta.concrete_fields]
+    content_types = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv",
+    }
+    encoder = DjangoJSONEncoder()
+
+    def list(self, request, *args, **kwargs):
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in self.content_types:
+            raise ValidationError(
+                {"export_format": f"Must be one of {', '.join(self.content_types)}."}
+            )
+
+        # Rows are read after this view returns, so database is chosen while routing
+        # for this request still applies
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .using(router.db_for_read(Post))
+            .values_list(*self.fields)
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        lines = getattr(self, f"to_{export_format}")(rows)
+        response = StreamingHttpResponse(
+            lines, content_type=self.content_types[export_format]
+        )
+        response["Content-Disposition"] = f'attachment; filename="posts.{export_format}"'
+        return response
+
+    def format_row(self, row):
+        """Formats dates of given row as ISO 8601, the same way in all export formats."""
+        return [
+            self.encoder.default(value) if isinstance(value, datetime) else value
+            for value in row
+        ]
+
+    def to_ndjson(self, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(self.fields, self.format_row(row)))) + "\n"
+
+    def to_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.fields)
+        for row in rows:
+            yield writer.writerow(self.format_row(row))
+
+
+class PostAggregateList(ListAPIView):
+    """Lists precomputed post aggregates of the dimension given in url, with most posts first.
+    A single aggregate is looked up by `key` query parameter.
+    """
+    serializer_class = PostAggregateSerializer
+
+    def get_queryset(self):
+        dimension = self.kwargs["dimension"]
+        if dimension not in dict(PostAggregate.DIMENSION_CHOICES):
+            raise NotFound(f"Unknown dimension {dimension}")
+
+        queryset = PostAggregate.objects.filter(dimension=dimension)
+        if self.request.query_params.get("key"):
+            queryset = queryset.filter(key=self.request.query_params["key"])
+        return queryset
+
+
 @api_view(["GET"])
 def get_scrapper_info(request):
     st = ScrapperTracker.objects.get(pk=1)
@@ -59,3 +173,15 @@ def update_using_api(request):
 
     fetch_from_api.delay()
     return Response(status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def get_sync_info(request):
+    ut = UpdateSyncTracker.objects.get(pk=1)
+    context = {
+        "status": ut.get_status_display(),
+        "last_run_at": ut.last_run_at,
+        "last_run_finish_at": ut.last_run_finish_at,
+        "max_item": ut.max_item,
+    }
+    return Response(context)
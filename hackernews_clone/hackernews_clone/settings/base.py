@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hackernews_clone.db.ReplicaReadsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -93,6 +94,9 @@ DATABASES = {
     }
 }
 
+# Reads of safe web requests go to 'replica' database when it's configured
+DATABASE_ROUTERS = ['hackernews_clone.db.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -177,9 +181,14 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 30
 }
 
+# Number of rows fetched from db at a time while streaming posts export
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
 # Celery Configurations
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = 'django-cache'
+# Lets sentiment tasks be consumed in rank order, lower value is consumed first
+CELERY_BROKER_TRANSPORT_OPTIONS = {'priority_steps': list(range(10))}
 
 
 # IBM Watson Vars
@@ -192,3 +201,29 @@ HACKERNEWS_URL = 'https://news.ycombinator.com/'
 HACKERNEWS_API_URL = 'https://hacker-news.firebaseio.com/v0/'
 
 MAX_PAGE_TO_SCRAP_IN_PARALEL = int(os.getenv('MAX_PAGE_TO_SCRAP_IN_PARALEL'))
+# Pages scrapped per feed at most. News feed lists 500 posts in 17 pages of 30, newest feed
+# pages further back forever
+MAX_PAGE_TO_SCRAP_PER_FEED = int(os.getenv('MAX_PAGE_TO_SCRAP_PER_FEED', 17))
+
+# Comma separated Hackernews feeds to crawl, see hackernews_clone.posts.feeds.FEEDS
+CRAWL_FEEDS = os.getenv('CRAWL_FEEDS', 'news').split(',')
+
+# Sentiment scheduling: posts ranked up to SENTIMENT_FAST_LANE_MAX_RANK are scored on the
+# fast lane queue, posts ranked worse than SENTIMENT_MAX_RANK are not scored, and at most
+# SENTIMENT_BUDGET_PER_CRAWL sentiment calls are made per crawl. Feeds list at most 500 posts
+# and posts leave a feed from its tail as new ones come in, so by default posts past its 10th
+# page, the last 200 posts of a full feed, aren't scored
+SENTIMENT_FAST_LANE_MAX_RANK = int(os.getenv('SENTIMENT_FAST_LANE_MAX_RANK', 30))
+SENTIMENT_MAX_RANK = int(os.getenv('SENTIMENT_MAX_RANK', 300))
+SENTIMENT_BUDGET_PER_CRAWL = int(os.getenv('SENTIMENT_BUDGET_PER_CRAWL', 500))
+
+# Sentiment backpressure: enqueueing to sentiment_queue is deferred for
+# SENTIMENT_BACKPRESSURE_DELAY seconds while it holds SENTIMENT_QUEUE_HIGH_WATERMARK tasks
+SENTIMENT_QUEUE_HIGH_WATERMARK = int(os.getenv('SENTIMENT_QUEUE_HIGH_WATERMARK', 200))
+SENTIMENT_BACKPRESSURE_DELAY = int(os.getenv('SENTIMENT_BACKPRESSURE_DELAY', 10))
+# Seconds a post's sentiment is kept in flight at most, and a url's sentiment is cached
+SENTIMENT_INFLIGHT_TIMEOUT = int(os.getenv('SENTIMENT_INFLIGHT_TIMEOUT', 600))
+SENTIMENT_RESULT_TIMEOUT = int(os.getenv('SENTIMENT_RESULT_TIMEOUT', 60 * 60 * 24))
+
+# Seconds post updates are collected before being written to db in a single batch
+POST_UPDATE_BUFFER_WINDOW = float(os.getenv('POST_UPDATE_BUFFER_WINDOW', 2))
@@ -8,10 +8,24 @@ DATABASES = {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.environ.get('POSTGRES_DB'),
         'USER': os.environ.get('POSTGRES_USER'),
-        'HOST': 'db',
+        'HOST': os.environ.get('DB_HOST', 'db'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
-        'PORT': 5432,
+        'PORT': int(os.environ.get('DB_PORT', 5432)),
+        # Keep connections open between requests and tasks. Celery closes inherited
+        # connections in forked pool processes, and closes connections older than this
+        # before and after each task, the same way Django does around requests.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Named cursors don't survive transaction pooling of pgbouncer
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_PGBOUNCER') == '1',
     }
 }
 
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('DB_REPLICA_HOST'),
+        'PORT': int(os.environ.get('DB_REPLICA_PORT', 5432)),
+        'TEST': {'MIRROR': 'default'},
+    }
+
 CORS_ALLOW_ALL_ORIGINS = True